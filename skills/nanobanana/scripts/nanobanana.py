@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 """NanoBanana - CLI for Gemini image generation."""
 
+from __future__ import annotations
+
 import argparse
+import functools
 import importlib.util
 import io
+import mimetypes
 import os
 import shutil
 import subprocess
 import sys
-from datetime import datetime
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Auto-install dependencies if missing
 def _ensure_deps():
@@ -20,9 +25,12 @@ def _ensure_deps():
     ]
     missing = []
     for module, package in required:
+        # Probe without importing so startup doesn't pay for the SDK.
         try:
-            __import__(module)
+            found = importlib.util.find_spec(module) is not None
         except ImportError:
+            found = False
+        if not found:
             missing.append(package)
     if missing:
         print(f"Installing dependencies: {', '.join(missing)}")
@@ -39,14 +47,21 @@ def _ensure_deps():
 
 _ensure_deps()
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-from PIL import Image
+# The SDK and Pillow are imported where they are used so that --help and
+# argument errors don't pay for loading them.
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
 
 
 def _load_environment() -> None:
     """Load credentials from the working tree or this skill's private .env."""
+    # Exported values take precedence, so there is nothing to look up.
+    if os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"):
+        return
+
+    from dotenv import load_dotenv
+
     candidates = [directory / ".env" for directory in (Path.cwd(), *Path.cwd().parents)]
     candidates.append(Path(__file__).resolve().parent.parent / ".env")
 
@@ -65,27 +80,94 @@ def _load_environment() -> None:
 
 _load_environment()
 
+PRO_MODEL = "gemini-3-pro-image-preview"
+FLASH_MODEL = "gemini-3.1-flash-image-preview"
+
 MAX_REFERENCE_IMAGES = 14
 FLASH_HIGH_FIDELITY_REFERENCE_HINT = 10
 PRO_HIGH_FIDELITY_REFERENCE_HINT = 6
 
+ASPECT_RATIOS = ("1:1", "2:3", "3:2", "3:4", "4:3", "4:5", "5:4", "9:16", "16:9", "21:9", "1:4", "4:1", "1:8", "8:1")
+PRO_INVALID_RATIOS = frozenset({"1:4", "4:1", "1:8", "8:1"})
+RESOLUTIONS = ("0.5K", "1K", "2K", "4K")
+THINKING_LEVELS = ("minimal", "high")
+
+# Image MIME types the API accepts as input; other formats are sent as PNG.
+INPUT_IMAGE_MIME_TYPES = frozenset({"image/png", "image/jpeg", "image/webp", "image/heic", "image/heif"})
+
+_CLIENT: genai.Client | None = None
+
 
 def get_client() -> genai.Client:
-    """Get authenticated Gemini client."""
+    """Get the authenticated Gemini client, creating it on first use.
+
+    The client is shared so repeated requests reuse its HTTP connection pool
+    instead of repeating credential and TLS setup.
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+
     if not os.environ.get("GEMINI_API_KEY") and not os.environ.get("GOOGLE_API_KEY"):
         print("Error: GEMINI_API_KEY environment variable not set.", file=sys.stderr)
         print("Get your API key at: https://aistudio.google.com/apikey", file=sys.stderr)
         sys.exit(1)
-    return genai.Client()
+
+    from google import genai
+
+    _CLIENT = genai.Client()
+    return _CLIENT
 
 
-def load_image(path: str):
-    """Load an image from disk and return an in-memory copy."""
+def load_image_part(path: str) -> types.Part:
+    """Read an image from disk as a request part.
+
+    Formats the API accepts are sent as the original bytes, typed from the
+    file header rather than the extension; anything else Pillow can read is
+    converted to PNG. Raises ValueError if the file cannot be read.
+    """
+    from google.genai import types
+    from PIL import Image
+
     try:
+        # Pillow cannot read HEIC/HEIF without a plugin, but the API can.
+        guessed_mime = mimetypes.guess_type(path)[0]
+        if guessed_mime in ("image/heic", "image/heif"):
+            return types.Part.from_bytes(data=Path(path).read_bytes(), mime_type=guessed_mime)
+
+        # Opening only parses the header; pixels are decoded just to convert.
         with Image.open(path) as image:
-            return image.copy()
+            # Many camera JPEGs open as MPO, which is plain JPEG to the API.
+            mime_type = "image/jpeg" if image.format == "MPO" else Image.MIME.get(image.format)
+            if mime_type in INPUT_IMAGE_MIME_TYPES:
+                data = Path(path).read_bytes()
+            else:
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                data, mime_type = buffer.getvalue(), "image/png"
     except Exception as exc:
-        print(f"Error: Failed to open image '{path}': {exc}", file=sys.stderr)
+        raise ValueError(f"Failed to open image '{path}': {exc}") from exc
+
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+def load_image_parts(paths: list[str]) -> list[types.Part]:
+    """Read several images as request parts, concurrently when there are many."""
+    # Import once here so worker threads don't race on the first import.
+    import google.genai.types  # noqa: F401
+    import PIL.Image  # noqa: F401
+
+    try:
+        if len(paths) <= 1:
+            return [load_image_part(path) for path in paths]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # File reads release the GIL, so threads overlap the disk I/O.
+        with ThreadPoolExecutor(max_workers=min(len(paths), 8)) as executor:
+            return list(executor.map(load_image_part, paths))
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
         sys.exit(1)
 
 
@@ -98,6 +180,8 @@ def build_config(
     thinking_level: str | None,
 ) -> types.GenerateContentConfig:
     """Build shared generation config for both generate and edit flows."""
+    from google.genai import types
+
     # The CLI exposes the friendly 0.5K label; the API expects 512 pixels.
     image_config_kwargs = {"image_size": "512" if size == "0.5K" else size}
     if aspect_ratio:
@@ -138,6 +222,12 @@ def validate_reference_count(references: list[str] | None, use_pro: bool) -> Non
         return
 
     ref_count = len(references)
+    high_fidelity_hint = (
+        PRO_HIGH_FIDELITY_REFERENCE_HINT if use_pro else FLASH_HIGH_FIDELITY_REFERENCE_HINT
+    )
+    if ref_count <= high_fidelity_hint:
+        return
+
     model_name = "Gemini 3 Pro" if use_pro else "Gemini 3.1 Flash"
 
     if ref_count > MAX_REFERENCE_IMAGES:
@@ -148,31 +238,26 @@ def validate_reference_count(references: list[str] | None, use_pro: bool) -> Non
         )
         sys.exit(1)
 
-    high_fidelity_hint = (
-        PRO_HIGH_FIDELITY_REFERENCE_HINT if use_pro else FLASH_HIGH_FIDELITY_REFERENCE_HINT
+    print(
+        f"Warning: {model_name} may reduce high-fidelity matching above "
+        f"{high_fidelity_hint} reference images (received {ref_count}).",
+        file=sys.stderr,
     )
-    if ref_count > high_fidelity_hint:
-        print(
-            f"Warning: {model_name} may reduce high-fidelity matching above "
-            f"{high_fidelity_hint} reference images (received {ref_count}).",
-            file=sys.stderr,
-        )
 
 
 def iter_response_parts(response):
-    """Yield response parts across SDK response shapes."""
+    """Return response parts across SDK response shapes."""
+    # The SDK's ``parts`` already covers the common single-candidate case.
     response_parts = getattr(response, "parts", None)
     if response_parts:
-        yield from response_parts
-        return
+        return response_parts
 
-    candidates = getattr(response, "candidates", None) or []
-    for candidate in candidates:
-        content = getattr(candidate, "content", None)
-        if not content:
-            continue
-        parts = getattr(content, "parts", None) or []
-        yield from parts
+    candidates = getattr(response, "candidates", None) or ()
+    return [
+        part
+        for candidate in candidates
+        for part in (getattr(getattr(candidate, "content", None), "parts", None) or ())
+    ]
 
 
 def finish_reasons(response) -> list[str]:
@@ -205,20 +290,31 @@ _MIME_TO_EXT = {
 }
 
 
+def _write_messages(messages: list[str]) -> None:
+    """Write buffered stdout lines in a single call and clear the buffer."""
+    if messages:
+        sys.stdout.write("\n".join(messages) + "\n")
+        messages.clear()
+
+
 def save_image(response, output: str | None) -> str:
     """Extract and save image from response.
 
     Honors the user's chosen extension by re-encoding to the matching format
     (so e.g. ``-o foo.png`` always yields a real PNG, even if the model
     returned JPEG bytes). When no output path is given, the auto-generated
-    filename uses the source mime-type's natural extension.
+    filename uses the source mime-type's natural extension. If the returned
+    bytes are already in the target format (as detected from the bytes, not
+    the declared mime-type) they are written as-is.
     """
     saw_parts = False
+    # Buffer stdout output so it is written in a single call.
+    messages: list[str] = []
 
     for part in iter_response_parts(response):
         saw_parts = True
         if getattr(part, "text", None):
-            print(f"Gemini: {part.text}")
+            messages.append(f"Gemini: {part.text}")
 
         # Thinking interim images should not be treated as final output.
         if getattr(part, "thought", False):
@@ -234,13 +330,25 @@ def save_image(response, output: str | None) -> str:
                 ext = os.path.splitext(output_path)[1].lower()
                 pil_format = _EXT_TO_PIL_FORMAT.get(ext)
             else:
-                output_path = f"nanobanana_{datetime.now().strftime('%Y%m%d_%H%M%S')}{source_ext}"
+                output_path = f"nanobanana_{time.strftime('%Y%m%d_%H%M%S')}{source_ext}"
                 pil_format = _EXT_TO_PIL_FORMAT.get(source_ext)
 
+            from PIL import Image
+
             try:
                 pil_image = Image.open(io.BytesIO(inline_data.data))
-                pil_image.load()
+                # Skip the decode/re-encode round trip when the bytes are
+                # already in the target format.
+                passthrough = pil_image.format == pil_format
+                if passthrough:
+                    # verify() checks the stream's structure (and checksums,
+                    # where the format has them) without decoding pixels.
+                    Image.open(io.BytesIO(inline_data.data)).verify()
+                else:
+                    pil_image.load()
             except Exception as exc:
+                # Keep the model's text ahead of the warning it relates to.
+                _write_messages(messages)
                 print(f"Warning: Failed to decode image output: {exc}", file=sys.stderr)
                 continue
 
@@ -248,11 +356,23 @@ def save_image(response, output: str | None) -> str:
             if pil_format == "JPEG" and pil_image.mode in ("RGBA", "LA", "P"):
                 pil_image = pil_image.convert("RGB")
 
-            save_kwargs = {"format": pil_format} if pil_format else {}
-            pil_image.save(output_path, **save_kwargs)
-            print(f"Image saved to: {output_path}")
+            try:
+                if passthrough:
+                    Path(output_path).write_bytes(inline_data.data)
+                else:
+                    save_kwargs = {"format": pil_format} if pil_format else {}
+                    pil_image.save(output_path, **save_kwargs)
+            except Exception:
+                # Don't lose the model's text if the save itself fails.
+                _write_messages(messages)
+                raise
+
+            messages.append(f"Image saved to: {output_path}")
+            _write_messages(messages)
             return output_path
 
+    _write_messages(messages)
+
     if not saw_parts:
         reasons = finish_reasons(response)
         if reasons:
@@ -272,6 +392,34 @@ def save_image(response, output: str | None) -> str:
     sys.exit(1)
 
 
+def _request_image(
+    client: genai.Client,
+    contents: list,
+    *,
+    output: str | None,
+    aspect_ratio: str | None,
+    size: str,
+    grounded: bool,
+    image_search: bool,
+    use_pro: bool,
+    thinking_level: str | None,
+) -> str:
+    """Send a generate/edit request and save the returned image."""
+    response = client.models.generate_content(
+        model=PRO_MODEL if use_pro else FLASH_MODEL,
+        contents=contents,
+        config=build_config(
+            aspect_ratio=aspect_ratio,
+            size=size,
+            grounded=grounded,
+            image_search=image_search,
+            thinking_level=thinking_level,
+        ),
+    )
+
+    return save_image(response, output)
+
+
 def generate_image(
     prompt: str,
     output: str | None = None,
@@ -282,31 +430,27 @@ def generate_image(
     references: list[str] | None = None,
     use_pro: bool = False,
     thinking_level: str | None = None,
+    client: genai.Client | None = None,
 ) -> str:
     """Generate an image using Gemini and save it."""
-    client = get_client()
+    client = client or get_client()
 
     contents = [prompt]
     if references:
-        for ref_path in references:
-            contents.append(load_image(ref_path))
-
-    model_name = "gemini-3-pro-image-preview" if use_pro else "gemini-3.1-flash-image-preview"
-
-    response = client.models.generate_content(
-        model=model_name,
-        contents=contents,
-        config=build_config(
-            aspect_ratio=aspect_ratio or "1:1",
-            size=size,
-            grounded=grounded,
-            image_search=image_search,
-            thinking_level=thinking_level,
-        ),
+        contents.extend(load_image_parts(references))
+
+    return _request_image(
+        client,
+        contents,
+        output=output,
+        aspect_ratio=aspect_ratio or "1:1",
+        size=size,
+        grounded=grounded,
+        image_search=image_search,
+        use_pro=use_pro,
+        thinking_level=thinking_level,
     )
 
-    return save_image(response, output)
-
 
 def edit_image(
     input_path: str,
@@ -319,33 +463,29 @@ def edit_image(
     references: list[str] | None = None,
     use_pro: bool = False,
     thinking_level: str | None = None,
+    client: genai.Client | None = None,
 ) -> str:
     """Edit an existing image using Gemini."""
-    client = get_client()
-
-    contents = [prompt, load_image(input_path)]
-    if references:
-        for ref_path in references:
-            contents.append(load_image(ref_path))
-
-    model_name = "gemini-3-pro-image-preview" if use_pro else "gemini-3.1-flash-image-preview"
-
-    response = client.models.generate_content(
-        model=model_name,
-        contents=contents,
-        config=build_config(
-            aspect_ratio=aspect_ratio,
-            size=size,
-            grounded=grounded,
-            image_search=image_search,
-            thinking_level=thinking_level,
-        ),
+    client = client or get_client()
+
+    contents = [prompt, *load_image_parts([input_path, *(references or [])])]
+
+    return _request_image(
+        client,
+        contents,
+        output=output,
+        aspect_ratio=aspect_ratio,
+        size=size,
+        grounded=grounded,
+        image_search=image_search,
+        use_pro=use_pro,
+        thinking_level=thinking_level,
     )
 
-    return save_image(response, output)
-
 
-def main():
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI parser once; repeated main() calls reuse it."""
     parser = argparse.ArgumentParser(
         prog="nanobanana",
         description="NanoBanana - Generate and edit images with Gemini 3 Pro and 3.1 Flash",
@@ -387,14 +527,14 @@ Examples:
         "-a", "--aspect-ratio",
         default=None,
         metavar="RATIO",
-        choices=["1:1", "2:3", "3:2", "3:4", "4:3", "4:5", "5:4", "9:16", "16:9", "21:9", "1:4", "4:1", "1:8", "8:1"],
+        choices=ASPECT_RATIOS,
         help="Aspect ratio (generate default: 1:1; edit default: keep input ratio)",
     )
     parser.add_argument(
         "-r", "--resolution",
         default="1K",
         metavar="RES",
-        choices=["0.5K", "1K", "2K", "4K"],
+        choices=RESOLUTIONS,
         help="Resolution: 0.5K, 1K, 2K, 4K (default: 1K)",
     )
     parser.add_argument(
@@ -414,17 +554,21 @@ Examples:
     )
     parser.add_argument(
         "-t", "--thinking",
-        choices=["minimal", "high"],
+        choices=THINKING_LEVELS,
         help="Thinking level (minimal or high)",
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
 
     if args.pro:
         invalid_flags = []
         if args.resolution == "0.5K":
             invalid_flags.append("-r 0.5K")
-        if args.aspect_ratio in {"1:4", "4:1", "1:8", "8:1"}:
+        if args.aspect_ratio in PRO_INVALID_RATIOS:
             invalid_flags.append(f"-a {args.aspect_ratio}")
         if args.image_search:
             invalid_flags.append("-i")